@@ -1,2 +1,4 @@
 from .main import main
-main()
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
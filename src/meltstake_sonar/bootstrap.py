@@ -1,19 +1,38 @@
+import os
+import copy
+import logging
+import time
 import tomllib
-import serial
-import json
-from serial.tools import list_ports
-from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from . import utils
 from . import scan
 
+# pyserial is imported where it's used so importing this module doesn't load the serial backends
+if TYPE_CHECKING:
+    import serial
+
 _DATA_PATH = None
 
+# Configuration file directory (ROOT/configs), resolved once at import
+_CONFIGS_DIR = Path(__file__).resolve().parents[2] / "configs"
+
+# UTC timestamp format used to name each deployment's data directory
+_DIR_TIME_FMT = "%Y-%m-%d_%H.%M.%S"
+
+# Seconds a serial port enumeration is reused before the ports are scanned again
+_PORT_SCAN_TTL_S = 30.0
+_PORT_SCAN: tuple[float, list] | None = None
+
+# Parsed configuration files, keyed by path, stored with the file's modification time and size
+_CFG_CACHE: dict[Path, tuple[int, int, dict]] = {}
+
 # Default parameters, in case of configuration load failure
 _DEFAULT_CONNECTION: dict[str, object] = {
     "device_name": "usbserial",
     "port": None,
+    "latency_timer_ms": 1,
 }
 
 _DEFAULT_SWITCH_CMD: dict[str, int] = {
@@ -30,6 +49,25 @@ _DEFAULT_SWITCH_CMD: dict[str, int] = {
     "data_points": 50,
 }
 
+# Switch command validation schema: (key, min, max) for clamped integers
+_SWITCH_RANGES: tuple[tuple[str, int, int], ...] = (
+    ("range", 1, 200),
+    ("freq", 0, 200),
+    ("start_gain", 0, 40),
+    ("absorption", 0, 255),
+    ("train_angle", 0, 120),
+    ("sector_width", 0, 120),
+    ("step_size", 0, 8),
+    ("pulse_length", 1, 100),
+    ("min_range", 0, 250),
+)
+
+# Switch command validation schema: (key, allowed values) for enumerated integers
+_SWITCH_ENUMS: tuple[tuple[str, frozenset[int]], ...] = (
+    ("logf", frozenset({0, 1, 2, 3})),
+    ("data_points", frozenset({25, 50})),
+)
+
 def _norm_optional_str(val: object) -> str | None:
     """Checks for an input; if it's a string, strips whitespace from string if present."""
 
@@ -47,11 +85,15 @@ def _norm_optional_str(val: object) -> str | None:
 def _coerce_int(val: object) -> int | None:
     """If input is not an integer, trys to set it to be an integer, if not returns None."""
 
+    # If entry is a plain integer (the common case from TOML), return normally
+    if type(val) is int:
+        return val
+
     # If entry is a boolean, return none
     if isinstance(val, bool):
         return None
     
-    # If entry is an integer, return normally
+    # If entry is another integer type, return normally
     if isinstance(val, int):
         return val
     
@@ -95,18 +137,20 @@ def _clamp_int(dst: dict, key: str, default: int, lo: int, hi: int,) -> None:
     
     # If integer is below minimum, set to minimum
     if n < lo:
-        n = lo
+        utils.append_log(f"Config '{key}' below minimum ({n} < {lo}); clamping to {lo}")
+        dst[key] = lo
         return
     
     # If integer is above maximum, set to maximum
     if n > hi:
-        n = hi
+        utils.append_log(f"Config '{key}' above maximum ({n} > {hi}); clamping to {hi}")
+        dst[key] = hi
         return
     
     # Set input key
     dst[key] = n
 
-def _enum_int(dst: dict, key: str, default: int, allowed: set[int],) -> None:
+def _enum_int(dst: dict, key: str, default: int, allowed: frozenset[int],) -> None:
     """"Checks whether input integer matches allowed values."""
     
     # Get key
@@ -130,15 +174,24 @@ def _load_config(config: str) -> dict:
     """
 
     # Establish configuration path
-    ROOT = Path(__file__).resolve().parents[2]
-    configs_dir = ROOT / "configs"
-    primary_path = configs_dir / Path(config)
-    fallback_path = configs_dir / "default_config.toml"
+    primary_path = _CONFIGS_DIR / Path(config)
+    fallback_path = _CONFIGS_DIR / "default_config.toml"
 
     # Function to load configuration .toml file at given path as a dictionary
     def _try_load(path: Path) -> dict:
-        with path.open("rb") as f:
-            return tomllib.load(f)
+
+        # Reuse the parsed file if it hasn't changed since it was last loaded
+        st = path.stat()
+        cached = _CFG_CACHE.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return copy.deepcopy(cached[2])
+
+        # Read the whole file in one call and parse from memory
+        cfg = tomllib.loads(path.read_bytes().decode("utf-8"))
+        _CFG_CACHE[path] = (st.st_mtime_ns, st.st_size, cfg)
+
+        # Hand out a copy so callers can't mutate the cached dictionary
+        return copy.deepcopy(cfg)
 
     # Try requested config
     try:
@@ -146,13 +199,15 @@ def _load_config(config: str) -> dict:
 
     # If it fails, fallback to default_config.toml
     except (FileNotFoundError, tomllib.TOMLDecodeError, OSError) as e1:
-        utils.append_log(f"Failed to load configuration file at {primary_path}: {e1}")
-
-        # If primary already is the fallback, don't loop
-        if primary_path.resolve() == fallback_path.resolve():
+        # If primary already is the fallback, don't loop (both share _CONFIGS_DIR, so compare directly before resolving)
+        if primary_path == fallback_path or primary_path.resolve() == fallback_path.resolve():
+            utils.append_log(f"Failed to load configuration file at {primary_path}: {e1}")
             raise
 
-        utils.append_log(f"Falling back to default configuration at {fallback_path}")
+        utils.append_log(
+            f"Failed to load configuration file at {primary_path}: {e1}",
+            f"Falling back to default configuration at {fallback_path}",
+        )
 
         # Try default_config.toml
         try:
@@ -169,23 +224,42 @@ def _load_config(config: str) -> dict:
         utils.append_log(f"Configuration file loaded: {primary_path}")
         return cfg
 
-def _auto_detect_port(device_name: str) -> str | None:
+def _list_ports() -> list:
+    """Return detected serial ports, reusing the last scan for up to `_PORT_SCAN_TTL_S` seconds."""
+
+    from serial.tools import list_ports
+
+    global _PORT_SCAN
+
+    # Enumerate ports only if there's no recent scan to reuse
+    now = time.monotonic()
+    if _PORT_SCAN is None or now - _PORT_SCAN[0] > _PORT_SCAN_TTL_S:
+        _PORT_SCAN = (now, list_ports.comports())
+
+    return _PORT_SCAN[1]
+
+def _clear_port_scan() -> None:
+    """Forget the cached serial port scan."""
+
+    global _PORT_SCAN
+    _PORT_SCAN = None
+
+def _auto_detect_port(device_name: str | None) -> str | None:
     """Automatic serial port detection, compatible with macOS and Raspberry Pi."""
 
-    ports = list_ports.comports()
+    ports = _list_ports()
 
     # Log detected ports for debugging
     for p in ports:
         utils.append_log(f"Detected port: {p.device} | Description: {p.description} | Manufacturer: {p.manufacturer}")
 
-    # Match against device, description, and manufacturer
+    # Match against device, description, and manufacturer, returning on the first hit
+    # (an empty needle would match every port, so a missing name goes straight to the fallback)
+    needle = (device_name or "").casefold()
     for p in ports:
-        fields = [
-            (p.device or "").lower(),
-            (p.description or "").lower(),
-            (p.manufacturer or "").lower(),
-        ]
-        if any(device_name.lower() in field for field in fields):
+        if needle and (needle in (p.device or "").casefold()
+                or needle in (p.description or "").casefold()
+                or needle in (p.manufacturer or "").casefold()):
             return p.device
 
     # Fallback: return first available port
@@ -196,12 +270,37 @@ def _auto_detect_port(device_name: str) -> str | None:
     return None
 
 
+def _set_latency_timer(port: str, latency_ms: int) -> None:
+    """Set the FTDI USB-serial latency timer through sysfs (Linux only, best effort).
+
+    The driver default of 16 ms holds back the tail of each sonar response; 1 ms releases it
+    as soon as the terminator arrives, at the cost of more USB polling.
+    """
+
+    # Resolve udev symlinks (e.g. /dev/ttySonar) to the kernel tty name
+    tty = os.path.basename(os.path.realpath(port))
+    latency_path = Path(f"/sys/bus/usb-serial/devices/{tty}/latency_timer")
+
+    # Not an FTDI/usb-serial device, or not Linux
+    if not latency_path.exists():
+        return
+
+    try:
+        latency_path.write_text(f"{latency_ms}\n")
+    except OSError as e:
+        utils.append_log(
+            f"Failed to set latency timer for {port!r} to {latency_ms} ms "
+            f"(needs write access to {latency_path}, e.g. root or a udev rule): {e}",
+            level=logging.WARNING,
+        )
+    else:
+        utils.append_log(f"Latency timer for {port!r} set to {latency_ms} ms")
+
 def init_data_dir(data_dir: str) -> None:
     """Initialize data directory for storage of files generated during runtime."""
 
     # Get datetime and format for file naming
-    utc_dt = datetime.now(timezone.utc)
-    dt_formatted = utc_dt.strftime("%Y-%m-%d_%H.%M.%S")
+    dt_formatted = time.strftime(_DIR_TIME_FMT, time.gmtime())
     data_path = f"{data_dir}/{dt_formatted}"
  
     # Set path to data directory as global variable in all modules
@@ -216,8 +315,10 @@ def create_log_file() -> None:
     # Create a log file at directory "logs"
     log_path = utils.make_file("sonar.log")
 
-    utils.append_log(f"Melt Stake 881A Sonar deployment log initialized")
-    utils.append_log(f"Path to log: {log_path}")
+    utils.append_log(
+        "Melt Stake 881A Sonar deployment log initialized",
+        f"Path to log: {log_path}",
+    )
 
 def create_run_index() -> None:
     """Create a run index of data filenames for parsing."""
@@ -237,6 +338,8 @@ def create_run_index() -> None:
 def create_config_json(switch_cmd: dict) -> None:
     """Write configuration to a json file for parsing."""
 
+    import json
+
     # Set path
     json_path = Path(f"{_DATA_PATH}/configuration.json")
 
@@ -248,11 +351,9 @@ def create_config_json(switch_cmd: dict) -> None:
     else:
         utils.append_log(f"Created configuration.json at {json_path}")
 
-    # Append configuration dictionary to json
+    # Serialize configuration dictionary in memory and write it in one call
     try:
-        with json_path.open("w", encoding="utf-8") as f:
-            json.dump({"scan": switch_cmd}, f, indent=2, sort_keys=True)
-            f.write("\n")
+        json_path.write_text(json.dumps({"scan": switch_cmd}, indent=2, sort_keys=True) + "\n", encoding="utf-8")
     except Exception as e:
         utils.append_log(f"Failed to write switch_cmd dictionary to configuration.json at {json_path}: {e}")
     else:
@@ -265,19 +366,15 @@ def parse_config(config: str) -> tuple[dict, dict]:
     # Load configuration from .toml file
     cfg = _load_config(config)
 
-    # Try to get connection and switch_cmd keys, if it fails, set to default
+    # Try to get connection and switch_cmd keys layered over the defaults, if it fails, set to default
     try:
-        connection = dict(cfg.get("connection", {}))
-        switch_cmd = dict(cfg.get("switch_cmd", {}))
+        connection = {**_DEFAULT_CONNECTION, **cfg.get("connection", {})}
+        switch_cmd = {**_DEFAULT_SWITCH_CMD, **cfg.get("switch_cmd", {})}
     except Exception as e:
         utils.append_log(f"Failed to parse configuration from config.toml: {e}, setting to default.")
         switch_cmd = _DEFAULT_SWITCH_CMD
         raise
 
-    # Fill missing connection keys with defaults
-    for k, v in _DEFAULT_CONNECTION.items():
-        connection.setdefault(k, v)
-
     # Validate connection parameters
     connection["port"] = _norm_optional_str(connection.get("port"))
     connection["device_name"] = _norm_optional_str(connection.get("device_name"))
@@ -286,28 +383,20 @@ def parse_config(config: str) -> tuple[dict, dict]:
     if connection["port"] is None and connection["device_name"] is None:
         _set_default(connection, "device_name", _DEFAULT_CONNECTION["device_name"], "both port and device_name missing/blank")
 
-    # Fill missing switch command keys with defaults
-    for k, v in _DEFAULT_SWITCH_CMD.items():
-        switch_cmd.setdefault(k, v)
+    # Validate USB-serial latency timer (0 leaves the driver default)
+    _clamp_int(connection, "latency_timer_ms", _DEFAULT_CONNECTION["latency_timer_ms"], 0, 255)
 
     # Validate switch command parameters
-    _clamp_int(switch_cmd, "range", _DEFAULT_SWITCH_CMD["range"], 1, 200)
-    _clamp_int(switch_cmd, "freq", _DEFAULT_SWITCH_CMD["freq"], 0, 200)
-    _clamp_int(switch_cmd, "start_gain", _DEFAULT_SWITCH_CMD["start_gain"], 0, 40)
-    _clamp_int(switch_cmd, "absorption", _DEFAULT_SWITCH_CMD["absorption"], 0, 255)
-    _clamp_int(switch_cmd, "train_angle", _DEFAULT_SWITCH_CMD["train_angle"], 0, 120)
-    _clamp_int(switch_cmd, "sector_width", _DEFAULT_SWITCH_CMD["sector_width"], 0, 120)
-    _clamp_int(switch_cmd, "step_size", _DEFAULT_SWITCH_CMD["step_size"], 0, 8)
-    _clamp_int(switch_cmd, "pulse_length", _DEFAULT_SWITCH_CMD["pulse_length"], 1, 100)
-    _clamp_int(switch_cmd, "min_range", _DEFAULT_SWITCH_CMD["min_range"], 0, 250)
-    _enum_int(switch_cmd, "logf", _DEFAULT_SWITCH_CMD["logf"], {0, 1, 2, 3})
-    _enum_int(switch_cmd, "data_points", _DEFAULT_SWITCH_CMD["data_points"], {25, 50})
+    for key, lo, hi in _SWITCH_RANGES:
+        _clamp_int(switch_cmd, key, _DEFAULT_SWITCH_CMD[key], lo, hi)
+    for key, allowed in _SWITCH_ENUMS:
+        _enum_int(switch_cmd, key, _DEFAULT_SWITCH_CMD[key], allowed)
 
     utils.append_log(f"Configuration file parsed - {switch_cmd}")
 
     return connection, switch_cmd
 
-def init_serial(connection: dict, baud: int = 115200, timeout: float = 1.0) -> serial.Serial:
+def init_serial(connection: dict, baud: int = 115200, timeout: float = 1.0) -> "serial.Serial":
     """Initialize and return a serial connection.
 
     Args:
@@ -321,13 +410,15 @@ def init_serial(connection: dict, baud: int = 115200, timeout: float = 1.0) -> s
         serial.SerialException: If no port is available or the port cannot be opened.
         OSError: If the OS refuses access to the device (permissions/in-use).
     """
-    
+
+    import serial
+
     # Get variables from connection configuration
     port = connection["port"]
     device_name = connection["device_name"]
 
-    # If no port is specified, auto-detect which port the device is on
-    if port is None:
+    # Only auto-detect which port the device is on if no port is specified
+    if not port:
         port = _auto_detect_port(device_name)
 
     # If no port, raise an error
@@ -348,10 +439,23 @@ def init_serial(connection: dict, baud: int = 115200, timeout: float = 1.0) -> s
         )
     except (serial.SerialException, OSError) as e:
         utils.append_log(f"Failed to open serial port {port!r} at {baud} baud: {e}")
+
+        # Drop the cached port scan so a retry re-enumerates instead of reusing a stale port
+        if not connection["port"]:
+            _clear_port_scan()
         raise
     else:
         utils.append_log(f"Serial port opened: {port!r} @ {baud} baud")
 
+    # Shorten the USB-serial latency timer so responses aren't held in the adapter
+    latency_ms = connection.get("latency_timer_ms", 0)
+    if latency_ms:
+        _set_latency_timer(port, latency_ms)
+
+    # Enlarge driver buffers where pyserial supports it (Windows only)
+    if hasattr(ser, "set_buffer_size"):
+        ser.set_buffer_size(rx_size=8192, tx_size=8192)
+
     # Reset read and write buffers
     ser.reset_input_buffer()
     ser.reset_output_buffer()
@@ -1,12 +1,15 @@
-import serial
 import threading
 import logging
-import threading
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 from . import scan
+from . import utils
 from . import bootstrap
 
+if TYPE_CHECKING:
+    import serial
+
 log = logging.getLogger(__name__)
 
 class Handler:
@@ -16,8 +19,8 @@ class Handler:
     init_time: str
     connection: dict
     switch_cmd: dict
-    device: serial.Serial
-    binary_switch: bytearray
+    device: "serial.Serial"
+    binary_switch: bytes
 
     # Runs on object initialization
     def __init__(self, config: str = "default_config.toml", data_dir: str | None = None):
@@ -42,4 +45,7 @@ class Handler:
 
     # Begins the scanning process
     def start_scan(self, stop_event: threading.Event | None = None) -> None:
-        scan.scan(self.switch_cmd, self.device, stop_event)
\ No newline at end of file
+        try:
+            scan.scan(self.switch_cmd, self.device, stop_event)
+        finally:
+            utils.flush_log()
\ No newline at end of file
@@ -1,4 +1,7 @@
+import os
 import logging
+import selectors
+import signal
 import sys
 import threading
 
@@ -16,20 +19,72 @@ def setup_logging(debug: bool) -> None:
         stream=sys.stdout,
     )
 
+# Words that stop a debug-mode scan when entered on stdin
+_STOP_WORDS = frozenset({"s", "quit", "exit", "q", "stop"})
+
 # Listener function for start stop of capture from CLI
-def _quit_listener(stop_event: threading.Event) -> None:
-    """Blocks waiting for user input; sets stop_event when user requests quit."""
-    while not stop_event.is_set():
-        line = sys.stdin.readline()
-        if not line:
-            return
-        if line.strip().lower() in {"s", "quit", "exit", "q", "stop"}:
-            stop_event.set()
-            return
+def _quit_listener(stop_event: threading.Event, poll_s: float = 0.25) -> None:
+    """Waits for user input; sets stop_event when user requests quit.
+
+    Polls the stdin file descriptor with a selector and reads it directly, splitting lines itself, so
+    the thread also returns once stop_event is set elsewhere and no input sits unseen in Python's stdin
+    buffer. Falls back to a blocking readline where stdin can't be registered or polled (e.g. Windows consoles).
+    """
+
+    # Register the stdin descriptor for readiness polling, if the platform supports it
+    sel: selectors.BaseSelector | None = None
+    try:
+        fd = sys.stdin.fileno()
+        sel = selectors.DefaultSelector()
+        sel.register(fd, selectors.EVENT_READ)
+    except (AttributeError, ValueError, OSError):
+        if sel is not None:
+            sel.close()
+        sel = None
+
+    pending = b""
+    try:
+        while not stop_event.is_set():
+
+            # Blocking fallback
+            if sel is None:
+                line = sys.stdin.readline()
+                if not line:
+                    return
+                if line.strip().lower() in _STOP_WORDS:
+                    stop_event.set()
+                    return
+                continue
+
+            # Some platforms accept the registration but fail on select; switch to the blocking path
+            try:
+                ready = sel.select(timeout=poll_s)
+            except OSError:
+                sel.close()
+                sel = None
+                continue
+            if not ready:
+                continue
+
+            # Read whatever is available and check every complete line in it
+            chunk = os.read(fd, 1024)
+            if not chunk:
+                return
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.decode(errors="replace").strip().lower() in _STOP_WORDS:
+                    stop_event.set()
+                    return
+    finally:
+        if sel is not None:
+            sel.close()
 
 # Main loop (runs when package is executed)
 def main() -> None:
 
+    # Exit through the interpreter on SIGTERM (systemd stop) so buffered log lines are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
     # Parse arguments from CLI execution
     args = utils.parse_args()
 
@@ -51,7 +106,7 @@ def main() -> None:
 
         # Print instructions for listener
         user = input("Press Enter to start scanning (or type 's' then Enter to stop): ").strip().lower()
-        if user in {"s", "quit", "exit", "q", "stop"}:
+        if user in _STOP_WORDS:
             return
         
         # Start thread for listener
@@ -64,6 +119,11 @@ def main() -> None:
             handler.start_scan(stop_event=stop_event)
         except KeyboardInterrupt:
             stop_event.set()
+        finally:
+
+            # Release the listener once scanning has ended
+            stop_event.set()
+            t.join(timeout=1.0)
 
     # If debugging is not enabled...
     else:
@@ -1,15 +1,80 @@
 import time
+import struct
+import logging
 import threading
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import BinaryIO
 
 from . import utils
 
+log = logging.getLogger(__name__)
 _DATA_PATH = None
+_RUN_INDEX_PATH = None
 
-def _transact_switch(device: str, binary_switch: bytes, dat_path: str | Path, retries: int = 5, retry_delay_s: float = 0.25,) -> bytes:
+# Set when a transaction fails, so the next one clears whatever the failure left in the port buffers
+_NEEDS_RESET = False
+
+# Fixed 881A response header length; bytes 10 - 11 carry the 7-bit packed data byte count
+_HEADER_LEN = 12
+
+# Response header layout: 3-byte ASCII header followed by nine single-byte fields
+_HEADER = struct.Struct("<3s9B")
+
+# Reply tags of imaging data frames (25 and 50 data point modes), the only frames that carry a head position
+_DATA_HEADERS = frozenset({b"IMX", b"IGX"})
+
+# Head position in degrees for every 13-bit packed step count (bytes 5 - 6), offset 600 steps at 0.3 degrees each
+_HEADPOS = tuple((i - 600) * 0.3 for i in range(1 << 13))
+
+def _write_all(file: BinaryIO, data: bytes) -> None:
+    """Write all of data to an unbuffered file, continuing after partial writes.
+
+    A raw FileIO write can accept fewer bytes than given (e.g. disk full) without raising; a truncated
+    frame would break the header/length framing of everything after it in the .dat file.
+    """
+
+    view = memoryview(data)
+    while view:
+        n = file.write(view)
+        if not n:
+            raise OSError(f"short write ({len(data) - len(view)} of {len(data)} bytes written)")
+        view = view[n:]
+
+def _read_response(device) -> bytes:
+    """Read one sonar response (12-byte header, data bytes, 0xFC terminator) with sized reads.
+
+    pyserial's `read_until` pulls one byte per call; the header gives the data length, so the
+    rest of the frame is read in one call. Falls back to `read_until` if the frame isn't terminated.
+    """
+
+    # Read the fixed-length header
+    header = device.read(_HEADER_LEN)
+    if len(header) < _HEADER_LEN:
+        return header
+
+    # Read data bytes plus terminator in one call
+    n = (header[11] << 7) | (header[10] & 127)
+    read_data = header + device.read(n + 1)
+
+    # If the frame is short or unterminated, resync on the terminator as before
+    if not read_data.endswith(b"\xfc"):
+        read_data += device.read_until(b"\xfc")
+
+    return read_data
+
+def _backoff_s(attempt: int, base_s: float, cap_s: float) -> float:
+    """Exponential retry delay: base_s doubled per failed attempt, capped at cap_s."""
+
+    return min(cap_s, base_s * (1 << (attempt - 1)))
+
+def _transact_switch(device: str, binary_switch: bytes, dat_file: BinaryIO | None, retries: int = 5,
+                     retry_base_s: float = 0.005, retry_cap_s: float = 0.5,) -> bytes:
     """Write one switch command to sonar device and read response.
 
+    Port buffers are reset only after a failed attempt or transaction. Retries back off
+    exponentially from `retry_base_s` up to `retry_cap_s`.
+
     Retries on:
       - Buffer reset errors (non-fatal, still continues)
       - Send/write errors
@@ -20,15 +85,24 @@ def _transact_switch(device: str, binary_switch: bytes, dat_path: str | Path, re
     Returns b"" if all attempts fail.
     """
 
+    global _NEEDS_RESET
+
+    # Length a complete write must report
+    expected_len = len(binary_switch)
+
     # Attempt switch transaction "attempt" number of times if failed
     for attempt in range(1, retries + 2):
-        
-        # Clear buffers
-        try:
-            device.reset_input_buffer()
-            device.reset_output_buffer()
-        except Exception as e:
-            utils.append_log(f"Switch transaction attempt {attempt}: failed to reset buffers: {e}")
+
+        # Clear buffers only after a failure; a clean transaction leaves them drained
+        if _NEEDS_RESET:
+            try:
+                device.reset_input_buffer()
+                device.reset_output_buffer()
+            except Exception as e:
+                utils.append_log(f"Switch transaction attempt {attempt}: failed to reset buffers: {e}")
+
+        # Treat the buffers as dirty until a terminated response comes back
+        _NEEDS_RESET = True
 
         # Write switch command
         try:
@@ -37,26 +111,26 @@ def _transact_switch(device: str, binary_switch: bytes, dat_path: str | Path, re
         except Exception as e:
             utils.append_log(f"Switch transaction attempt {attempt}: failed to send command: {e}")
             if attempt <= retries:
-                time.sleep(retry_delay_s)
+                time.sleep(_backoff_s(attempt, retry_base_s, retry_cap_s))
                 continue
             return b""
 
         # Validate switch length
-        if sent_count != len(binary_switch):
-            utils.append_log(f"Switch transaction attempt {attempt}: short write (sent {sent_count}, expected {len(binary_switch)})",)
+        if sent_count != expected_len:
+            utils.append_log(f"Switch transaction attempt {attempt}: short write (sent {sent_count}, expected {expected_len})",)
             if attempt <= retries:
-                time.sleep(retry_delay_s)
+                time.sleep(_backoff_s(attempt, retry_base_s, retry_cap_s))
                 continue
             return b""
 
         # Read sonar response
         try:
-            read_data = device.read_until(b"\xfc")
-            print(read_data)
+            read_data = _read_response(device)
+            log.debug("Switch transaction attempt %d: response %r", attempt, read_data)
         except Exception as e:
             utils.append_log(f"Switch transaction attempt {attempt}: failed to read response: {e}")
             if attempt <= retries:
-                time.sleep(retry_delay_s)
+                time.sleep(_backoff_s(attempt, retry_base_s, retry_cap_s))
                 continue
             return b""
 
@@ -64,24 +138,28 @@ def _transact_switch(device: str, binary_switch: bytes, dat_path: str | Path, re
         if not read_data or not read_data.endswith(b"\xfc"):
             utils.append_log(f"Switch transaction attempt {attempt}: bad/unterminated response (len={len(read_data)})",)
             if attempt <= retries:
-                time.sleep(retry_delay_s)
+                time.sleep(_backoff_s(attempt, retry_base_s, retry_cap_s))
                 continue
             return b""
 
-        # Write raw response to data file
-        if dat_path:
+        # Write raw response to the open data file
+        if dat_file is not None:
             try:
-                with open(dat_path, "ab") as file:
-                    file.write(read_data)
+                _write_all(dat_file, read_data)
             except Exception as e:
-                utils.append_log(f"Failed to write raw data to {dat_path}: {e}")
+                utils.append_log(f"Failed to write raw data to {dat_file.name}: {e}")
 
+        _NEEDS_RESET = False
         return read_data
 
     return b""
 
-def _parse_response(sonar_data: bytes) -> dict:
-    """Convert sonar response into dictionary with engineering units."""
+def _parse_response(sonar_data: bytes, include_data: bool = True) -> dict:
+    """Convert sonar response into dictionary with engineering units.
+
+    The scan loop only needs the header fields; it passes `include_data=False` to skip
+    hex-encoding the data bytes, which are already in the .dat file for offline parsing.
+    """
 
     # Initialize response as an empty dictionary
     response: dict = {}
@@ -93,27 +171,19 @@ def _parse_response(sonar_data: bytes) -> dict:
     
     # Convert raw sonar response to engineering units and pack in response object
     try:
-        response["header"] = bytes(sonar_data[0:3]).decode("utf-8", errors="strict")
-        response["headid"] = sonar_data[3]
-        response["serialstatus"] = sonar_data[4]
-        if response["header"] != "IOX":
-            response["stepdirection"] = 1 if sonar_data[6] & 64 else 0
-            response["headpos"] = (((sonar_data[6] & 63) << 7 | (sonar_data[5] & 127)) - 600) * 0.3
-            response["comment"] = (
-                "Computing head position"
-                + str(response["headpos"])
-                + " from byte 5="
-                + str(sonar_data[5])
-                + " and 6="
-                + str(sonar_data[6])
-            )
-            response["range"] = sonar_data[7]
-            response["profilerange"] = (sonar_data[9] << 7) | (sonar_data[8] & 127)
-        response["databytes"] = (sonar_data[11] << 7) | (sonar_data[10] & 127)
-        data = ""
-        for val in sonar_data[12:-1]:
-            data += "{0:02x}".format(val)
-        response["data"] = data
+        header, headid, status, b5, b6, rng, b8, b9, b10, b11 = _HEADER.unpack_from(sonar_data)
+        response["header"] = header.decode("ascii")
+        response["headid"] = headid
+        response["serialstatus"] = status
+        if header != b"IOX":
+            response["stepdirection"] = 1 if b6 & 64 else 0
+            response["headpos_idx"] = headpos_idx = (b6 & 63) << 7 | (b5 & 127)
+            response["headpos"] = _HEADPOS[headpos_idx]
+            response["range"] = rng
+            response["profilerange"] = (b9 << 7) | (b8 & 127)
+        response["databytes"] = (b11 << 7) | (b10 & 127)
+        if include_data:
+            response["data"] = sonar_data[12:-1].hex()
 
         return response
     
@@ -121,8 +191,24 @@ def _parse_response(sonar_data: bytes) -> dict:
         utils.append_log(f"Parse error: failed to parse response (len={len(sonar_data)}): {e}")
         return {}
     
-def _make_dat_file(num_scan: int) -> str:
-    """Make .dat file to be appended with raw sonar data."""
+def _headpos_idx(sonar_data: bytes) -> int | None:
+    """Return the 13-bit head step count from a sonar response without building a response dict.
+
+    None if the response is too short, unterminated, or not an imaging data frame (IOX replies and
+    garbled or misaligned frames), so the caller recovers the position with a full read instead.
+    """
+
+    if (len(sonar_data) <= _HEADER_LEN
+            or sonar_data[-1] != 0xFC
+            or sonar_data[:3] not in _DATA_HEADERS):
+        return None
+    return (sonar_data[6] & 63) << 7 | (sonar_data[5] & 127)
+
+def _make_dat_file(num_scan: int) -> BinaryIO:
+    """Make .dat file to be appended with raw sonar data and return it open for appending.
+
+    The file stays open for the whole scan; the caller closes it at the scan boundary.
+    """
 
     # Make .dat file to store raw data (one per scan)
     try:
@@ -136,18 +222,19 @@ def _make_dat_file(num_scan: int) -> str:
 
     # Write data file name to run index csv
     try:
-        utc_dt = datetime.now(timezone.utc)
-        timestamp = utc_dt.strftime("%Y-%m-%d %H:%M:%S")
-        csv_path = f"{_DATA_PATH}/RunIndex.csv"
-        with open(csv_path, "a") as outfile:
-                    outfile.write(timestamp + "," + "scan" + "," + file + "\n")
+        csv_path = _RUN_INDEX_PATH
+        utils.append_row(csv_path, f"{datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S}", "scan", file)
     except Exception:
         utils.append_log(f"Failed to append {file} to RunIndex.csv at {csv_path}")
         raise
     else:
         utils.append_log(f"{file} appended to RunIndex.csv at {csv_path}")
 
-    return data_path
+    # Flush buffered log lines and the run index row at each scan boundary
+    utils.flush_log()
+
+    # Unbuffered: each response goes to the OS in a single write, with nothing left in a Python buffer
+    return open(data_path, "ab", buffering=0)
 
 def _scan_extents(switch_cmd: dict) -> tuple[float, float, float]:
     """Calculates and outputs centerline and low/high angular extents of the sonar's sweep in degrees.
@@ -170,12 +257,12 @@ def _in_sector(pos: float, centerline: float, sector: float) -> bool:
     delta = abs(_wrap180(pos - centerline))
     return delta <= half
 
-def _read_validate(device, switch: bytes, dat_path, retries: int = 3,
+def _read_validate(device, switch: bytes, dat_file: BinaryIO | None, retries: int = 3,
                 retry_delay_s: float = 0.15) -> dict | None:
     """Transact a non-stepping switch and parse, retrying the pair until a response returns or attempts are exhausted.
     """
     for attempt in range(1, retries + 2):
-        response = _parse_response(_transact_switch(device, switch, dat_path))
+        response = _parse_response(_transact_switch(device, switch, dat_file), include_data=False)
         if response and "headpos" in response:
             return response
         utils.append_log(
@@ -187,24 +274,29 @@ def _read_validate(device, switch: bytes, dat_path, retries: int = 3,
     return None
 
 
-def _step_and_read(device, step_switch: bytes, check_switch: bytes, dat_path,
-                   retries: int = 3, retry_delay_s: float = 0.15) -> dict | None:
-    """Send a stepping and return its parsed response.
+def _step_and_read(device, step_switch: bytes, check_switch: bytes, dat_file: BinaryIO | None,
+                   retries: int = 3, retry_delay_s: float = 0.15) -> int | None:
+    """Send a stepping switch and return the head step count from its response.
+
+    Only the head position is decoded; the full response is already in the .dat file.
     """
-    response = _parse_response(_transact_switch(device, step_switch, dat_path))
-    if response and "headpos" in response:
-        return response
+    idx = _headpos_idx(_transact_switch(device, step_switch, dat_file))
+    if idx is not None:
+        return idx
     utils.append_log("Stepping ping unparseable; attempting to recover position.")
-    return _read_validate(device, check_switch, None, retries, retry_delay_s)
+    response = _read_validate(device, check_switch, None, retries, retry_delay_s)
+    return None if response is None else response["headpos_idx"]
 
 def set_data_path(data_path):
-    """Set global data path variable for "scan" module."""
+    """Set global data and run index path variables for "scan" module."""
 
-    global _DATA_PATH
+    global _DATA_PATH, _RUN_INDEX_PATH
     _DATA_PATH = data_path
+    _RUN_INDEX_PATH = Path(f"{data_path}/RunIndex.csv")
 
 def scan(switch_cmd: dict, device: str, stop_event: threading.Event | None = None):
-    """Does an initial dummy ping to get head position, another dummy ping to establish the first recorded step, then 
+    """Does an initial dummy ping to get head position, then records every step, starting a new scan each time the head
+    returns to the initial position twice.
     """
 
     # Initialize scan number and return count
@@ -215,11 +307,9 @@ def scan(switch_cmd: dict, device: str, stop_event: threading.Event | None = Non
     check_switch = utils.build_binary(switch_cmd, False, True, "CHECK")
     step_switch = utils.build_binary(switch_cmd, False, False, "PING")
 
-    # Determine position tolerance from step size to harden init_pos and pos matching from floating point precision discrepancies
+    # Positions are matched on the integer head step count to within half a step
     step_size = switch_cmd["step_size"]
-    deg_per_step = step_size * 0.3
-    pos_tolerance = deg_per_step / 2
-    if deg_per_step == 0:
+    if step_size == 0:
         utils.append_log("step_size is 0; head cannot advance. Ending deployment.")
         return
 
@@ -234,10 +324,12 @@ def scan(switch_cmd: dict, device: str, stop_event: threading.Event | None = Non
         utils.append_log("Could not read initial head position; ending deployment.")
         return
     init_pos = round(response["headpos"], 1)
+    init_idx = response["headpos_idx"]
     utils.append_log(f"Initial head position found at {init_pos}")
 
     # Bound the seek so a frame mismatch or empty sector aborts instead of looping forever
-    max_seek_steps = int(360 / deg_per_step) + 1 if deg_per_step else 0
+    # (one full revolution is 1200 head units of 0.3 degrees, so this stays in integers)
+    max_seek_steps = 1200 // step_size + 1
 
     # If the head starts outside the sweep, step it in until it lands within the extents
     seek = 0
@@ -253,58 +345,62 @@ def scan(switch_cmd: dict, device: str, stop_event: threading.Event | None = Non
             return
         
         # Advance one step without recording data, then re-read position without stepping
-        _transact_switch(device, step_switch, dat_path=None)
+        _transact_switch(device, step_switch, dat_file=None)
         response = _read_validate(device, check_switch, None)
         if response is None:
             utils.append_log("Could not read head position during seek; ending deployment.")
             return
         init_pos = round(response["headpos"], 1)
+        init_idx = response["headpos_idx"]
         seek += 1
 
     utils.append_log(f"Initial head position in range at {init_pos}")
 
-    # Send another dummy ping, this position will be the first step of each scan
+    # The head sits at the initial position, so the first recorded step leaves the initial zone
     utils.append_log(f"Starting scan {num_scan}...")
-    dat_path = _make_dat_file(num_scan)
-    response = _step_and_read(device, step_switch, check_switch, dat_path=None)
-    if response is None:
-        utils.append_log("Could not read first step; ending deployment.")
-        return
-    pos = round(response["headpos"], 1)
-    in_initial_zone = abs(pos - init_pos) < pos_tolerance
+    dat_file = _make_dat_file(num_scan)
+    in_initial_zone = True
 
-    # Loop indefinitely until termination command is given
-    while True:
-        if stop_event is not None and stop_event.is_set():
-            utils.append_log("Stop requested; ending deployment.")
-            return
-    
-        # Send a switch and record data, get response, record new position
-        response = _step_and_read(device, step_switch, check_switch, dat_path)
-        if response is None:
-            utils.append_log("Could not recover head position; ending deployment.")
-            return
-        pos = round(response["headpos"], 1)
-
-        # Rising edge check so entering the range of the initial zone counts once, removing double-counting recovery re-reads
-        at_initial = deg_per_step > 0 and abs(pos - init_pos) < pos_tolerance
-        
-
-        # If the head is at the initial position...
-        if at_initial and not in_initial_zone:
-
-            # Record a return
-            return_count += 1
-            utils.append_log(
-                f"Head at initial position — init {init_pos}, current {pos}, returns {return_count}"
-            )
+    # Keep the scan's data file open until the scan ends, closing it on any exit
+    try:
 
-            # If the head has returned to the initial position twice, start a break the scan and start a new scan
-            if return_count == 2:
-                utils.append_log(f"Finished scan {num_scan}")
-                num_scan += 1
-                return_count = 0
-                dat_path = _make_dat_file(num_scan)
-                utils.append_log(f"Starting scan {num_scan}...")
+        # Bind the stop check once so the loop doesn't re-test for a missing event every step
+        stop_requested = stop_event.is_set if stop_event is not None else lambda: False
 
-        in_initial_zone = at_initial
\ No newline at end of file
+        # Loop indefinitely until termination command is given
+        while True:
+            if stop_requested():
+                utils.append_log("Stop requested; ending deployment.")
+                return
+    
+            # Send a switch and record data, get new head step count
+            idx = _step_and_read(device, step_switch, check_switch, dat_file)
+            if idx is None:
+                utils.append_log("Could not recover head position; ending deployment.")
+                return
+
+            # Rising edge check so entering the range of the initial zone counts once, removing double-counting recovery re-reads
+            # (step_size is known to be non-zero here, the scan ends early otherwise)
+            at_initial = 2 * abs(idx - init_idx) < step_size
+
+            # If the head is at the initial position...
+            if at_initial and not in_initial_zone:
+
+                # Record a return
+                return_count += 1
+                utils.append_log(
+                    f"Head at initial position — init {init_pos}, current {round(_HEADPOS[idx], 1)}, returns {return_count}"
+                )
+
+                # If the head has returned to the initial position twice, start a break the scan and start a new scan
+                if return_count == 2:
+                    utils.append_log(f"Finished scan {num_scan}")
+                    num_scan += 1
+                    return_count = 0
+                    dat_file.close()
+                    dat_file = _make_dat_file(num_scan)
+                    utils.append_log(f"Starting scan {num_scan}...")
+
+            in_initial_zone = at_initial
+    finally:
+        dat_file.close()
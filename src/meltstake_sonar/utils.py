@@ -1,67 +1,165 @@
 from pathlib import Path
+from typing import TextIO
 import time
+import struct
+import atexit
+import operator
+import functools
 import argparse
 import logging
+import threading
 
 
 log = logging.getLogger(__name__)
 _DATA_PATH = None
+_DATA_DIR = None
+_LOG_PATH = None
+
+# UTC time format prefixed to each log line, and the last formatted second
+_LOG_TIME_FMT = "%H:%M:%S"
+_LAST_SEC = -1
+_LAST_TIME = ""
+
+# Directories already created by make_file during this process
+_DIRS_MADE: set[Path] = set()
+
+class _LogWriter:
+    """Holds one buffered append handle per log file open for the life of the process.
+
+    Lines collect in the handle's buffer and a daemon thread pushes them to disk every
+    `flush_interval_s`, so an isolated line reaches disk even if nothing else is logged after it.
+    """
+
+    def __init__(self, flush_interval_s: float = 0.25) -> None:
+        self._fhs: dict[Path, TextIO] = {}
+        self._flush_interval_s = flush_interval_s
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def write(self, path: Path, text: str) -> None:
+        """Write text to the log file at path, opening it on first use."""
+
+        with self._lock:
+            fh = self._fhs.get(path)
+            if fh is None:
+                fh = self._fhs[path] = path.open("a", encoding="utf-8", buffering=8192)
+            fh.write(text)
+
+            # Start the periodic flusher on first use so importing this module starts no thread
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name="log-flusher", daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self) -> None:
+        """Flush every `flush_interval_s` until close_all is called."""
+
+        while not self._stop.wait(self._flush_interval_s):
+            self.flush()
+
+    def flush(self) -> None:
+        """Push buffered lines for every open log file to disk."""
+
+        with self._lock:
+            for fh in self._fhs.values():
+                fh.flush()
+
+    def close_all(self) -> None:
+        """Stop the flusher, then flush and close every open log file."""
+
+        self._stop.set()
+        with self._lock:
+            for fh in self._fhs.values():
+                fh.close()
+            self._fhs.clear()
+
+_LOG_WRITER = _LogWriter()
+atexit.register(_LOG_WRITER.close_all)
+
+# 27-byte switch command layout, one unsigned byte per field
+_SWITCH_STRUCT = struct.Struct("<27B")
+
+# Order in which switch_cmd values are read to key the command cache
+_SWITCH_KEYS = (
+    "range",
+    "start_gain",
+    "logf",
+    "absorption",
+    "train_angle",
+    "sector_width",
+    "step_size",
+    "pulse_length",
+    "min_range",
+    "data_points",
+    "freq",
+)
+_get_switch_params = operator.itemgetter(*_SWITCH_KEYS)
 
 def _utc_time_part() -> str:
     """Return the current UTC time as HH:MM:SS."""
 
-    # Get UTC time in human-readable format (hours.minutes.seconds)
-    my_time = time.strftime("%H:%M:%S", time.gmtime())
+    global _LAST_SEC, _LAST_TIME
+
+    # Only reformat when the second has changed since the last call
+    now = int(time.time())
+    if now != _LAST_SEC:
+        _LAST_SEC = now
+        _LAST_TIME = time.strftime(_LOG_TIME_FMT, time.gmtime(now))
 
-    return my_time
+    return _LAST_TIME
 
 def set_data_path(data_path):
-    """Set global data path variable for "utils" module."""
-    global _DATA_PATH
+    """Set global data and log path variables for "utils" module."""
+    global _DATA_PATH, _DATA_DIR, _LOG_PATH
     _DATA_PATH = data_path
+    _DATA_DIR = Path(data_path).expanduser()
+    _LOG_PATH = Path(f"{data_path}/sonar.log")
 
-def append_log(line: str) -> None:
-    """Append a line to the log file with a UTC time prefix.
+def append_log(*lines: str, level: int = logging.DEBUG) -> None:
+    """Append one or more lines to the log file with a UTC time prefix.
 
     Args:
-        line: Message to append (a trailing newline is added automatically).
+        *lines: Messages to append (a trailing newline is added to each automatically).
+        level: Level the lines are echoed at through `logging`; raise it for problems that should surface outside debug mode.
     """
 
-    # Get path to data directory from global variable (set during initialization)
-    data_path = _DATA_PATH
-    
     # UTC time to prepend each log entry
     prefix = _utc_time_part()
 
-    # If debug mode enabled, print all logged lines to console
-    log.debug(line)
+    # If debug mode enabled, print all logged lines to console (higher levels print regardless)
+    for line in lines:
+        log.log(level, line)
 
-    log_path = Path(f"{data_path}/sonar.log")
+    # Append all lines through the persistent buffered handle in one write (log path set during initialization)
+    _LOG_WRITER.write(_LOG_PATH, "".join(f"{prefix}: {line.rstrip()}\n" for line in lines))
 
-    # Open file and append line
-    with log_path.open("a", encoding="utf-8") as f:
-        f.write(f"{prefix}: {line.rstrip()}\n")
+def flush_log() -> None:
+    """Flush buffered log and run index lines to disk."""
+    _LOG_WRITER.flush()
+
+def append_row(path: Path, *fields: str) -> None:
+    """Append a comma-separated row to a CSV file through the persistent buffered handle."""
+    _LOG_WRITER.write(path, ",".join(fields) + "\n")
 
 def make_file(filename: str) -> Path:
-    """Create a path under `dir`, creating the directory if needed.
+    """Return a path under the data directory, creating the directory if needed.
+
+    The file itself is created by the caller's first append-mode open.
 
     Args:
         filename: Name of file with suffix
     """
 
-    # Prepend user home directory
-    out_dir = Path(_DATA_PATH).expanduser()
+    # Data directory with user home expanded (set during initialization)
+    out_dir = _DATA_DIR
 
-    # Make directory if it doesn't already exist
-    out_dir.mkdir(parents=True, exist_ok=True)
+    # Make directory if it hasn't already been made
+    if out_dir not in _DIRS_MADE:
+        out_dir.mkdir(parents=True, exist_ok=True)
+        _DIRS_MADE.add(out_dir)
 
     # Set file path with directory/filename
-    out_path = out_dir / filename
-
-    # Create file
-    out_path.touch(exist_ok=True)
-
-    return out_path
+    return out_dir / filename
 
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments for running a Melt Stake 881A sonar deployment.
@@ -103,63 +201,76 @@ def parse_args() -> argparse.Namespace:
 
     return p.parse_args()
 
-def build_binary(switch_cmd: dict, calibration: bool = False, no_step: bool = False, tag = str):
+@functools.lru_cache(maxsize=4)
+def _pack_switch(params: tuple[int, ...], calibrate: int, no_step: bool) -> bytes:
+    """Pack switch parameters (ordered as `_SWITCH_KEYS`) into the 27-byte command, cached per parameter set."""
+
+    (rng, start_gain, logf, absorption, train_angle, sector_width,
+     step_size, pulse_length, min_range, data_points, freq) = params
+
+    # Set step size to 0 no_step argument is set to true
+    if no_step:
+        step_size = 0
+
+    # Pack the whole command in one call
+    return _SWITCH_STRUCT.pack(
+        0xFE,           # Switch data header
+        0x44,           # Switch data header
+        16,             # Head ID
+        rng,            # Range
+        0,              # Reserved, must be 0
+        0,              # Rev / hold
+        0x43,           # Master / Slave (always slave)
+        0,              # Reserved, must be 0
+        start_gain,     # Start Gain
+        logf,           # Logf
+        absorption,     # Absorption
+        train_angle,    # Train angle
+        sector_width,   # Sector width
+        step_size,      # Step size
+        pulse_length,   # Pulse length
+        min_range,      # Profile Minimum Range
+        0,              # Reserved, must be 0
+        0,              # Reserved, must be 0
+        0,              # Reserved, must be 0
+        data_points,    # Data points
+        8,              # Resolution (8-bit)
+        0x06,           # 115200
+        0,              # 0 - off, 1 = on
+        calibrate,      # Calibrate, 0 = off, 1 = on
+        1,              # Switch delay
+        freq,           # Frequency
+        0xFD,           # Termination byte
+    )
+
+def build_binary(switch_cmd: dict, calibration: bool = False, no_step: bool = False, tag = str) -> bytes:
     """Build the 27-byte 881A sonar switch command from switch_cmd dictionary.
 
-    This constructs a fixed-length `bytearray(27)` using values from `switch_cmd`
-    and optionally enables calibration.
+    This packs a fixed-length 27-byte command from the values in `switch_cmd`
+    and optionally enables calibration. Commands are cached per
+    parameter set, so rebuilding with unchanged settings is a lookup.
 
     Args:
         switch_cmd: Dictionary of switch parameters (from `parse_config()`).
         calibration: If True, sets the calibration flag byte in the command.
 
     Returns:
-        A 27-byte command payload as a `bytearray`.
+        A 27-byte command payload as immutable `bytes` (shared with the command cache).
 
     Raises:
         KeyError: If `switch_cmd` is missing a required key.
         TypeError: If `switch_cmd` is not subscriptable or contains incompatible value types.
+        struct.error: If a switch parameter does not fit in one byte.
     """
     
-    # Length of byte command payload
-    command = bytearray(27)
-
     # Calibration flag
     calibrate = int(bool(calibration))
 
-    # Set step size to 0 no_step argument is set to true
-    step_size = 0 if no_step else switch_cmd["step_size"]
-
-    # Compile byte command payload based on switch command configuration settings
+    # Look up (or build and cache) the command for these switch parameters
     try:
-        command[0] = 0xFE                        # Switch data header
-        command[1] = 0x44                        # Switch data header
-        command[2] = 16                          # Head ID
-        command[3] = switch_cmd["range"]         # Range
-        command[4] = 0                           # Reserved, must be 0
-        command[5] = 0                           # Rev / hold
-        command[6] = 0x43                        # Master / Slave (always slave)
-        command[7] = 0                           # Reserved, must be 0
-        command[8]  = switch_cmd["start_gain"]   # Start Gain
-        command[9]  = switch_cmd["logf"]         # Logf
-        command[10] = switch_cmd["absorption"]   # Absorption
-        command[11] = switch_cmd["train_angle"]  # Train angle
-        command[12] = switch_cmd["sector_width"] # Sector width
-        command[13] = step_size                  # Step size
-        command[14] = switch_cmd["pulse_length"] # Pulse length
-        command[15] = switch_cmd["min_range"]    # Profile Minimum Range (reserved/unused here)
-        command[16] = 0                          # Reserved, must be 0
-        command[17] = 0                          # Reserved, must be 0
-        command[18] = 0                          # Reserved, must be 0
-        command[19] = switch_cmd["data_points"]  # Data points
-        command[20] = 8                          # Resolution (8-bit)
-        command[21] = 0x06                       # 115200
-        command[22] = 0                          # 0 - off, 1 = on
-        command[23] = calibrate                  # calibrate, 0 = off, 1 = on
-        command[24] = 1                          # Switch delay
-        command[25] = switch_cmd["freq"]         # Frequency
-        command[26] = 0xFD                       # Termination byte
-    except (KeyError, TypeError) as e:
+        params = _get_switch_params(switch_cmd)
+        command = _pack_switch(params, calibrate, no_step)
+    except (KeyError, TypeError, struct.error) as e:
         append_log(f"Failed to build binary command {tag} from switch_cmd: {e}")
         raise
     else:
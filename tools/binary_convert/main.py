@@ -15,27 +15,43 @@ def convertRun(path='./'):
     indexPath = os.path.join(path, 'RunIndex.csv')
     with open(indexPath, newline='') as csvfile:
         reportPath = os.path.join(path, 'RunData.csv')
-        with open(reportPath, 'w') as reportFile:
-            Parse881.write_csv_header(reportFile)
-            indexreader = csv.DictReader(csvfile)
+        # 1 MiB buffer so the OS sees large writes rather than one per few rows
+        with open(reportPath, 'w', newline='', buffering=1 << 20) as reportFile:
+            reportWriter = csv.writer(reportFile, lineterminator='\n')
+            Parse881.write_csv_header(reportWriter)
+            indexreader = csv.reader(csvfile)
+            indexHeader = next(indexreader, None)
+            if indexHeader is None:
+                return
+            typeCol = indexHeader.index('Type')
+            fileCol = indexHeader.index('File')
+            # Data files sit next to RunIndex.csv; join the directory once and prefix each name
+            filePrefix = os.path.join(path, '')
             for row in indexreader:
-                if row['Type'] == 'orientation':
-                    orientationFilePath = os.path.join(path, row['File'])
+                if not row:
+                    continue
+                rowType = row[typeCol]
+                rowFile = row[fileCol]
+                if rowType == 'orientation':
+                    orientationFilePath = filePrefix + rowFile
                     with open(orientationFilePath, 'rb') as orientationFile:
                         parser = op.OrientationParser()
-                        if parser.parse_data(row['File'], orientationFile):
-                            parser.write_csv(reportFile)
-                elif row['Type'] == 'scan' or row['Type'] == 'downward':
-                    scanFilePath = os.path.join(path, row['File'])
+                        if parser.parse_data(rowFile, orientationFile):
+                            parser.write_csv(reportWriter)
+                elif rowType == 'scan' or rowType == 'downward':
+                    scanFilePath = filePrefix + rowFile
                     with open(scanFilePath, 'rb') as scanFile:
-                        parser = ScanParser()
-                        if parser.parse_data(row['File'], scanFile):
-                            parser.write_csv(reportFile)
+                        parser = ScanParser(reportWriter)
+                        parser.parse_data(rowFile, scanFile)
                 else:
-                    print('Unrecognized type in RunIndex.csv: ' + row['Type'])
+                    print('Unrecognized type in RunIndex.csv: ' + rowType)
 
-datapath = ''
-if len(sys.argv) > 1:
-  datapath = sys.argv[1]
+def main():
+    datapath = ''
+    if len(sys.argv) > 1:
+      datapath = sys.argv[1]
 
-convertRun(datapath)
\ No newline at end of file
+    convertRun(datapath)
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
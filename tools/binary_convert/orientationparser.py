@@ -1,4 +1,9 @@
-from  .parse881 import Parse881
+import struct
+
+from  .parse881 import Parse881, defumigate
+
+# Orientation payload: seven little-endian (low, high) byte pairs starting at offset 0 of the data
+_ORIENTATION = struct.Struct('<7H')
 
 class OrientationParser (Parse881):
     """
@@ -23,7 +28,7 @@ class OrientationParser (Parse881):
                 print('Header data in orientation file ' + self.orientationFilePath + ' is short at ' + str(len(pingHeader) + ' bytes'))
             return False
 
-        datalength = self.defumigate(pingHeader[10], pingHeader[11])
+        datalength = defumigate(pingHeader[10], pingHeader[11])
         orientationData = orientationFile.read(datalength)
         if not orientationData or len(orientationData) < datalength:
             if not orientationData:
@@ -32,23 +37,17 @@ class OrientationParser (Parse881):
                 print('Data in orientation file ' + self.orientationFilePath + ' is short at ' + str(len(orientationData) + ' bytes'))
             return False
 
-        headersize = len(pingHeader)
-        tempExternal = self.defumigate(orientationData[12-headersize], orientationData[13-headersize])
+        tempExternal, tempInternal, depth, pitch, roll, heading, gyroheading = (
+            defumigate(v & 0xff, v >> 8) for v in _ORIENTATION.unpack_from(orientationData))
         self.parsed_data["tempExternal"] = tempExternal/16 - 55
-        tempInternal = self.defumigate(orientationData[14-headersize], orientationData[15-headersize])
         self.parsed_data["tempInternal"] = tempInternal/16 - 55
-        depth = self.defumigate(orientationData[16-headersize], orientationData[17-headersize])
         self.parsed_data["depth"] = depth / 10
-        pitch = self.defumigate(orientationData[18-headersize], orientationData[19-headersize])
         self.parsed_data["pitch"] = pitch / 10 - 90
-        roll = self.defumigate(orientationData[20-headersize], orientationData[21-headersize])
         self.parsed_data["roll"] = roll / 10 - 90
-        heading = self.defumigate(orientationData[22-headersize], orientationData[23-headersize])
         self.parsed_data["heading"] = heading / 10
-        gyroheading = self.defumigate(orientationData[24-headersize], orientationData[25-headersize])
         self.parsed_data["gyroheading"] = gyroheading / 10
 
         return True
 
-    def write_csv(self, file):
-        self.write_csv_data(file, self.parsed_data)
\ No newline at end of file
+    def write_csv(self, writer):
+        self.write_csv_data(writer, self.parsed_data)
\ No newline at end of file
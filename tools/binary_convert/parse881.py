@@ -1,6 +1,16 @@
+import operator
+
+
+def defumigate(lowbyte, highbyte):
+    return (highbyte & 0x3f) << 7 | (lowbyte & 0x7f)
+
+
 class Parse881:
     data_keys = ["File", "scan_index", "headposition", "stepdirection", "range", "profilerange",
                   "tempExternal", "tempInternal", "depth", "pitch", "roll", "heading", "gyroheading", "pingdata"]
+    empty_data = dict.fromkeys(data_keys, '')
+    # Every column ahead of pingdata, pulled from a record in one call
+    get_fields = operator.itemgetter(*data_keys[:-1])
 
 
     def __init__(self):
@@ -8,27 +18,19 @@ class Parse881:
 
 
     def make_parse_data(self) -> object:
+        return Parse881.empty_data.copy()
 
-        parsed_data = {}
-        for key in Parse881.data_keys:
-            parsed_data[key] = ''
 
-        return parsed_data
-
-
-    def defumigate(self, lowbyte, highbyte):
-        return (highbyte & 0x3f) << 7 | (lowbyte & 0x7f)
+    defumigate = staticmethod(defumigate)
     
 
-    def write_csv_header(file):
-        header = ','.join(Parse881.data_keys) + '\n'
-        file.write(header)
-        print(f'Header: {header.strip()}')
-
-    def write_csv_data(self, file, parsed_data):
-        data = []
-        for key in Parse881.data_keys:
-            data.append(str(parsed_data[key]))
-        data_line = ','.join(data) + '\n'
-        file.write(data_line)
+    def write_csv_header(writer):
+        writer.writerow(Parse881.data_keys)
+        print(f'Header: {",".join(Parse881.data_keys)}')
+
+    def write_csv_data(self, writer, parsed_data):
+        data = list(Parse881.get_fields(parsed_data))
+        # Ping bytes spill across the trailing columns; an empty ping still fills the pingdata column
+        data.extend(parsed_data['pingdata'] or ('',))
+        writer.writerow(data)
             
\ No newline at end of file
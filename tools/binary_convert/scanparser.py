@@ -1,54 +1,58 @@
 import os
+import struct
 
 from  .parse881 import Parse881
 
+# 12-byte ping header, one unsigned byte per field
+_HEADER = struct.Struct('<12B')
+
 class ScanParser (Parse881):
     """
-    Parse scan or downward data from an 881 file.
+    Parse scan or downward data from an 881 file, writing each ping to the report as it is parsed.
     """
-    def __init__(self):
-        self.scan_data = []
+    def __init__(self, writer):
+        self.writer = writer
         self.scan_index = 1
 
     def parse_data(self, fileName, scanFile) -> bool:
+        # Read the whole file once and walk it by offset; memoryview slices don't copy
+        scanBuffer = memoryview(scanFile.read())
+        offset = 0
+
         done = False
         while not done:
             parsed_data = self.make_parse_data()
             parsed_data['scan_index'] = self.scan_index
             parsed_data['File'] = fileName
 
-            pingHeader = scanFile.read(12)
-            if not pingHeader or len(pingHeader) < 12:
+            if len(scanBuffer) - offset < 12:
                 done = True
                 break
 
-            headposition = self.defumigate(pingHeader[5], pingHeader[6])
+            b5, b6, b7, b8, b9, b10, b11 = _HEADER.unpack_from(scanBuffer, offset)[5:]
+            offset += 12
+
+            headposition = (b6 & 0x3f) << 7 | (b5 & 0x7f)
             parsed_data['headposition'] = (headposition - 600) * 0.3
-            parsed_data['stepdirection'] = ' cw' if (pingHeader[6] & 0x40) != 0 else 'ccw'
-            parsed_data['range'] = pingHeader[7]
-            parsed_data['profilerange'] = self.defumigate(pingHeader[8], pingHeader[9])
+            parsed_data['stepdirection'] = ' cw' if (b6 & 0x40) != 0 else 'ccw'
+            parsed_data['range'] = b7
+            parsed_data['profilerange'] = (b9 & 0x3f) << 7 | (b8 & 0x7f)
 
-            datalength = self.defumigate(pingHeader[10], pingHeader[11])
-            scanData = scanFile.read(datalength)
+            datalength = (b11 & 0x3f) << 7 | (b10 & 0x7f)
+            scanData = scanBuffer[offset:offset + datalength]
+            offset += datalength
             if not scanData or len(scanData) < datalength:
                 if not scanData:
                     print('No data in scan or downward file')
                 else:
-                    print(f'Data {self.scan_index} in scan or downward file is short at {len(scanData)} bytes when it should be {datalength} ({pingHeader[10]},{pingHeader[11]})')
+                    print(f'Data {self.scan_index} in scan or downward file is short at {len(scanData)} bytes when it should be {datalength} ({b10},{b11})')
                 return False
 
-            pingData = ''
-            for scanbyte in scanData:
-                pingData += str(scanbyte) + ','
-            parsed_data['pingdata'] = pingData[:-1]
+            parsed_data['pingdata'] = scanData
 
-            _ = scanFile.read(1) # Read the 0xfc terminator
+            offset += 1 # Skip the 0xfc terminator
 
-            self.scan_data.append(parsed_data)
+            self.write_csv_data(self.writer, parsed_data)
             self.scan_index += 1
 
-        return True
-
-    def write_csv(self, file):
-        for scan in self.scan_data:
-            self.write_csv_data(file, scan)
\ No newline at end of file
+        return True
\ No newline at end of file